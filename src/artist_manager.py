@@ -1,29 +1,64 @@
-import spotipy
-from spotipy.oauth2 import SpotifyClientCredentials
-import json
-import requests
+import aiohttp
+import asyncio
+import orjson
+import os
 from bs4 import BeautifulSoup
 from typing import Dict, List, Optional, Tuple
 import re
 import sqlite3
+import time
+import unicodedata
+from collections import OrderedDict
 from datetime import datetime
+from itertools import chain
+from scrapers.session import fetch, get_session
+
+SPOTIFY_TOKEN_URL = 'https://accounts.spotify.com/api/token'
+SPOTIFY_SEARCH_URL = 'https://api.spotify.com/v1/search'
+SPOTIFY_CACHE_SIZE = 4096
+
+# Max names bound into one "IN (...)" lookup, well under SQLite's variable limit
+_LOOKUP_CHUNK_SIZE = 500
+
+
+def _normalize_name(name: str) -> str:
+    """Normalize an artist name for use as a cache key"""
+    return unicodedata.normalize('NFKD', name).lower().strip()
+
 
 class ArtistManager:
     def __init__(self, db_path='artists.db'):
         self.db_path = db_path
+        # One long-lived connection; transactions are opened explicitly with BEGIN
+        self.conn = sqlite3.connect(self.db_path, check_same_thread=False, isolation_level=None)
+        self.conn.executescript('''PRAGMA journal_mode=WAL;
+                                  PRAGMA synchronous=NORMAL;
+                                  PRAGMA temp_store=MEMORY;
+                                  PRAGMA cache_size=-65536;''')
         self.setup_database()
         
-        # Initialize Spotify client
-        try:
-            self.spotify = spotipy.Spotify(client_credentials_manager=SpotifyClientCredentials())
-        except:
-            self.spotify = None
+        # In-flight artist lookups, keyed by normalized name, so concurrent
+        # requests for the same artist share one task
+        self._inflight: Dict[str, asyncio.Task] = {}
+        
+        # Spotify client credentials, read from the same variables Spotipy uses
+        client_id = os.environ.get('SPOTIPY_CLIENT_ID')
+        client_secret = os.environ.get('SPOTIPY_CLIENT_SECRET')
+        if client_id and client_secret:
+            self.spotify_auth = aiohttp.BasicAuth(client_id, client_secret)
+        else:
+            self.spotify_auth = None
             print("Warning: Spotify API not configured")
+        
+        # Cached access token and search results (LRU, keyed by normalized name)
+        self._spotify_token: Optional[str] = None
+        self._spotify_token_expires = 0.0
+        self._spotify_token_lock = asyncio.Lock()
+        self._spotify_cache: OrderedDict = OrderedDict()
 
     def setup_database(self):
         """Create SQLite database for artists"""
-        conn = sqlite3.connect(self.db_path)
-        c = conn.cursor()
+        c = self.conn.cursor()
         
         # Artists table
         c.execute('''CREATE TABLE IF NOT EXISTS artists
@@ -48,25 +83,84 @@ class ArtistManager:
                      last_played DATETIME,
                      FOREIGN KEY(artist_id) REFERENCES artists(id))''')
         
-        conn.commit()
-        conn.close()
+        # Index the foreign keys used by artist lookups
+        c.execute('''CREATE INDEX IF NOT EXISTS idx_genres_artist ON artist_genres(artist_id)''')
+        
+        # One row per artist/venue pair, so venue plays can be upserted. Older
+        # databases may hold repeated pairs; keep only the latest before indexing.
+        c.execute('''SELECT 1 FROM sqlite_master
+                     WHERE type = 'index' AND name = 'idx_venues_artist_venue' ''')
+        if not c.fetchone():
+            with self.conn:
+                self.conn.execute('BEGIN')
+                self.conn.execute('''DELETE FROM artist_venues WHERE rowid NOT IN
+                                     (SELECT MAX(rowid) FROM artist_venues GROUP BY artist_id, venue)''')
+                self.conn.execute('''CREATE UNIQUE INDEX idx_venues_artist_venue
+                                     ON artist_venues(artist_id, venue)''')
+                # Superseded by the (artist_id, venue) index
+                self.conn.execute('''DROP INDEX IF EXISTS idx_venues_artist''')
 
     async def process_artist(self, artist_name: str, venue: str = None) -> Dict:
         """Main function to process an artist and get their information"""
+        key = _normalize_name(artist_name)
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.create_task(self._load_artist(artist_name))
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        
+        # Shielded so one cancelled caller doesn't cancel the lookup for the others
+        artist_info = await asyncio.shield(task)
+        
+        # Coalesced callers share one result, so copy it (and its lists) for each
+        artist_info = {field: list(value) if isinstance(value, list) else value
+                       for field, value in artist_info.items()}
+        
+        # Update venue information
+        if venue and artist_info.get('id'):
+            self.update_venue_info(artist_info['id'], venue)
+        return artist_info
+
+    async def _load_artist(self, artist_name: str) -> Dict:
+        """Load an artist from the database, gathering and saving them on a miss"""
         # Check database first
         artist_info = self.get_artist_from_db(artist_name)
         if artist_info:
-            # Update venue information
-            if venue:
-                self.update_venue_info(artist_info['id'], venue)
             return artist_info
 
         # If not in database, gather information from various sources
-        artist_info = await self.gather_artist_info(artist_name, venue)
+        artist_info = await self.gather_artist_info(artist_name)
         self.save_artist_to_db(artist_info)
         return artist_info
 
-    async def gather_artist_info(self, artist_name: str, venue: str = None) -> Dict:
+    async def process_artists(self, artist_names: List[str], venue: str = None) -> List[Dict]:
+        """Process a batch of artists, saving new ones and venue plays in bulk"""
+        # De-dupe by normalized name, keeping the first spelling seen
+        unique_names = {}
+        for name in artist_names:
+            unique_names.setdefault(_normalize_name(name), name)
+        names = list(unique_names.values())
+        
+        artists = {}
+        missing = []
+        for name in names:
+            artist_info = self.get_artist_from_db(name)
+            if artist_info:
+                artists[name] = artist_info
+            else:
+                missing.append(name)
+        
+        # Gather new artists concurrently, then write them all in one transaction
+        gathered = await asyncio.gather(*(self.gather_artist_info(name) for name in missing))
+        self.save_artists_bulk(gathered)
+        artists.update(zip(missing, gathered))
+        
+        artist_infos = [artists[name] for name in names]
+        if venue:
+            self.update_venues_bulk([info['id'] for info in artist_infos if info.get('id')], venue)
+        return artist_infos
+
+    async def gather_artist_info(self, artist_name: str) -> Dict:
         """Gather artist information from multiple sources"""
         info = {
             'name': artist_name,
@@ -76,52 +170,104 @@ class ArtistManager:
             'sources': []
         }
 
-        # Try Spotify first
-        if self.spotify:
-            spotify_info = self.get_spotify_info(artist_name)
-            if spotify_info:
-                info.update(spotify_info)
-                info['sources'].append('spotify')
+        spotify_info, social_info, venue_info = await asyncio.gather(
+            self.get_spotify_info(artist_name),
+            self.check_social_media(artist_name),
+            self.check_venue_history(artist_name),
+            return_exceptions=True
+        )
+        
+        # Genres and sources from each lookup, merged and de-duped once at the end
+        genre_chunks = []
+        source_chunks = []
+
+        # Spotify results
+        if isinstance(spotify_info, Exception):
+            print(f"Spotify lookup error: {str(spotify_info)}")
+        elif spotify_info:
+            info.update(spotify_info)
+            genre_chunks.append(spotify_info['genres'])
+            source_chunks.append(['spotify'])
 
-        # Check social media
-        social_info = await self.check_social_media(artist_name)
-        if social_info:
+        # Social media results
+        if isinstance(social_info, Exception):
+            print(f"Social media lookup error: {str(social_info)}")
+        elif social_info:
             info['is_local'] = info['is_local'] or social_info.get('is_local', False)
-            if social_info.get('genres'):
-                info['genres'].extend(social_info['genres'])
-            info['sources'].extend(social_info.get('sources', []))
+            genre_chunks.append(social_info.get('genres') or [])
+            source_chunks.append(social_info.get('sources', []))
 
-        # Check local venue histories
-        venue_info = await self.check_venue_history(artist_name)
-        if venue_info:
+        # Local venue history results
+        if isinstance(venue_info, Exception):
+            print(f"Venue history lookup error: {str(venue_info)}")
+        elif venue_info:
             info['is_local'] = info['is_local'] or venue_info.get('is_local', False)
-            if venue_info.get('genres'):
-                info['genres'].extend(venue_info['genres'])
-            info['sources'].extend(venue_info.get('sources', []))
+            genre_chunks.append(venue_info.get('genres') or [])
+            source_chunks.append(venue_info.get('sources', []))
 
-        # Add current venue if provided
-        if venue:
-            self.update_venue_info(info['id'], venue)
+        # dict.fromkeys de-dupes while keeping first-seen order
+        info['genres'] = list(dict.fromkeys(chain.from_iterable(genre_chunks)))
+        info['sources'] = list(dict.fromkeys(chain.from_iterable(source_chunks)))
 
         return info
 
-    def get_spotify_info(self, artist_name: str) -> Optional[Dict]:
+    async def get_spotify_info(self, artist_name: str) -> Optional[Dict]:
         """Get artist information from Spotify"""
-        if not self.spotify:
+        if not self.spotify_auth:
             return None
 
-        try:
-            results = self.spotify.search(q=artist_name, type='artist', limit=1)
-            if results['artists']['items']:
-                artist = results['artists']['items'][0]
-                return {
-                    'genres': artist['genres'],
-                    'popularity': artist['popularity'],
-                    'spotify_id': artist['id'],
-                    'confidence': 0.8 if artist['name'].lower() == artist_name.lower() else 0.5
-                }
-        except Exception as e:
-            print(f"Spotify API error: {str(e)}")
+        key = _normalize_name(artist_name)
+        if key in self._spotify_cache:
+            self._spotify_cache.move_to_end(key)
+            spotify_info = self._spotify_cache[key]
+        else:
+            try:
+                spotify_info = await self._search_spotify(artist_name)
+            except Exception as e:
+                print(f"Spotify API error: {str(e)}")
+                return None
+            
+            self._spotify_cache[key] = spotify_info
+            if len(self._spotify_cache) > SPOTIFY_CACHE_SIZE:
+                self._spotify_cache.popitem(last=False)
+        
+        # Copy so callers can't mutate the cached result
+        if spotify_info:
+            return dict(spotify_info, genres=list(spotify_info['genres']))
+        return None
+
+    async def _get_spotify_token(self) -> str:
+        """Get a client-credentials access token, refreshing it when expired"""
+        async with self._spotify_token_lock:
+            if self._spotify_token is None or time.monotonic() >= self._spotify_token_expires:
+                session = await get_session()
+                async with session.post(SPOTIFY_TOKEN_URL, data={'grant_type': 'client_credentials'},
+                                        auth=self.spotify_auth) as response:
+                    response.raise_for_status()
+                    token = orjson.loads(await response.text())
+                
+                self._spotify_token = token['access_token']
+                # Refresh a minute early so the token can't expire mid-request
+                self._spotify_token_expires = time.monotonic() + token['expires_in'] - 60
+            return self._spotify_token
+
+    async def _search_spotify(self, artist_name: str) -> Optional[Dict]:
+        """Search Spotify for an artist by name"""
+        token = await self._get_spotify_token()
+        response = await fetch(SPOTIFY_SEARCH_URL,
+                               params={'q': artist_name, 'type': 'artist', 'limit': 1},
+                               headers={'Authorization': f'Bearer {token}'})
+        response.raise_for_status()
+        results = orjson.loads(await response.text())
+        
+        if results['artists']['items']:
+            artist = results['artists']['items'][0]
+            return {
+                'genres': artist['genres'],
+                'popularity': artist['popularity'],
+                'spotify_id': artist['id'],
+                'confidence': 0.8 if _normalize_name(artist['name']) == _normalize_name(artist_name) else 0.5
+            }
         return None
 
     async def check_social_media(self, artist_name: str) -> Optional[Dict]:
@@ -168,51 +314,108 @@ class ArtistManager:
 
     def save_artist_to_db(self, artist_info: Dict):
         """Save artist information to database"""
-        conn = sqlite3.connect(self.db_path)
-        c = conn.cursor()
+        sources = ','.join(artist_info['sources'])
         
         try:
-            # Insert artist
-            c.execute('''INSERT INTO artists (name, is_local, verification_source, last_updated)
-                        VALUES (?, ?, ?, ?)''',
-                     (artist_info['name'], artist_info['is_local'],
-                      ','.join(artist_info['sources']), datetime.now()))
-            
-            artist_id = c.lastrowid
-            
-            # Insert genres
-            for genre in set(artist_info['genres']):
-                c.execute('''INSERT INTO artist_genres (artist_id, genre, confidence, source)
-                            VALUES (?, ?, ?, ?)''',
-                         (artist_id, genre, artist_info['confidence'],
-                          ','.join(artist_info['sources'])))
-            
-            conn.commit()
+            # Artist and all of its genres commit in a single transaction
+            with self.conn:
+                self.conn.execute('BEGIN')
+                # Upsert so an artist saved concurrently is refreshed rather than erroring
+                c = self.conn.execute('''INSERT INTO artists (name, is_local, verification_source, last_updated)
+                                        VALUES (?, ?, ?, ?)
+                                        ON CONFLICT(name) DO UPDATE SET
+                                            is_local = excluded.is_local,
+                                            verification_source = excluded.verification_source,
+                                            last_updated = excluded.last_updated
+                                        RETURNING id''',
+                                     (artist_info['name'], artist_info['is_local'],
+                                      sources, datetime.now()))
+                
+                artist_id = c.fetchone()[0]
+                
+                # Replace any genres from an earlier save
+                self.conn.execute('''DELETE FROM artist_genres WHERE artist_id = ?''', (artist_id,))
+                
+                # Genres arrive de-duped from gather_artist_info
+                genre_rows = [(artist_id, genre, artist_info['confidence'], sources)
+                              for genre in artist_info['genres']]
+                self.conn.executemany('''INSERT INTO artist_genres (artist_id, genre, confidence, source)
+                                         VALUES (?, ?, ?, ?)''', genre_rows)
         except Exception as e:
             print(f"Database error: {str(e)}")
-            conn.rollback()
-        finally:
-            conn.close()
+            return
+        
+        # Only hand out the id once the transaction has committed
+        artist_info['id'] = artist_id
+
+    def save_artists_bulk(self, artist_infos: List[Dict]):
+        """Save many artists and their genres in a single transaction"""
+        if not artist_infos:
+            return
+        
+        now = datetime.now()
+        try:
+            with self.conn:
+                # Take the write lock up front so nothing is saved between the lookup and insert
+                self.conn.execute('BEGIN IMMEDIATE')
+                
+                # Skip artists that are already saved (or repeated in the batch)
+                artist_ids = self._get_artist_ids([info['name'] for info in artist_infos])
+                new_infos = {}
+                for info in artist_infos:
+                    if info['name'] not in artist_ids:
+                        new_infos.setdefault(info['name'], info)
+                new_infos = list(new_infos.values())
+                
+                sources = {info['name']: ','.join(info['sources']) for info in new_infos}
+                self.conn.executemany('''INSERT OR IGNORE INTO artists (name, is_local, verification_source, last_updated)
+                                         VALUES (?, ?, ?, ?)''',
+                                      [(info['name'], info['is_local'], sources[info['name']], now)
+                                       for info in new_infos])
+                
+                new_ids = self._get_artist_ids([info['name'] for info in new_infos])
+                genre_rows = [(new_ids[info['name']], genre, info['confidence'], sources[info['name']])
+                              for info in new_infos
+                              for genre in info['genres']]
+                self.conn.executemany('''INSERT INTO artist_genres (artist_id, genre, confidence, source)
+                                         VALUES (?, ?, ?, ?)''', genre_rows)
+                
+                artist_ids.update(new_ids)
+        except Exception as e:
+            print(f"Database error: {str(e)}")
+            return
+        
+        # Only hand out ids once the transaction has committed
+        for info in artist_infos:
+            info['id'] = artist_ids.get(info['name'])
+
+    def _get_artist_ids(self, names: List[str]) -> Dict[str, int]:
+        """Look up artist ids by name"""
+        artist_ids = {}
+        names = list(dict.fromkeys(names))
+        for i in range(0, len(names), _LOOKUP_CHUNK_SIZE):
+            chunk = names[i:i + _LOOKUP_CHUNK_SIZE]
+            placeholders = ','.join('?' * len(chunk))
+            rows = self.conn.execute(f'''SELECT name, id FROM artists WHERE name IN ({placeholders})''', chunk)
+            artist_ids.update(rows)
+        return artist_ids
 
     def get_artist_from_db(self, artist_name: str) -> Optional[Dict]:
         """Retrieve artist information from database"""
-        conn = sqlite3.connect(self.db_path)
-        c = conn.cursor()
-        
         try:
-            c.execute('''SELECT * FROM artists WHERE name = ?''', (artist_name,))
-            artist = c.fetchone()
+            # Fetch the artist, genres and venues in one round-trip
+            rows = self.conn.execute('''SELECT a.id, a.name, a.is_local, a.verification_source, a.last_updated,
+                                             g.genre, v.venue, v.last_played
+                                      FROM artists a
+                                      LEFT JOIN artist_genres g ON g.artist_id = a.id
+                                      LEFT JOIN artist_venues v ON v.artist_id = a.id
+                                      WHERE a.name = ?''', (artist_name,)).fetchall()
             
-            if artist:
-                # Get genres
-                c.execute('''SELECT genre FROM artist_genres WHERE artist_id = ?''',
-                         (artist[0],))
-                genres = [row[0] for row in c.fetchall()]
-                
-                # Get venues
-                c.execute('''SELECT venue, last_played FROM artist_venues 
-                           WHERE artist_id = ?''', (artist[0],))
-                venues = [(row[0], row[1]) for row in c.fetchall()]
+            if rows:
+                artist = rows[0]
+                # The join repeats each genre per venue (and vice versa), so de-dupe in order
+                genres = list(dict.fromkeys(row[5] for row in rows if row[5] is not None))
+                venues = list(dict.fromkeys((row[6], row[7]) for row in rows if row[6] is not None))
                 
                 return {
                     'id': artist[0],
@@ -225,22 +428,29 @@ class ArtistManager:
                 }
         except Exception as e:
             print(f"Database error: {str(e)}")
-        finally:
-            conn.close()
         
         return None
 
     def update_venue_info(self, artist_id: int, venue: str):
         """Update venue information for an artist"""
-        conn = sqlite3.connect(self.db_path)
-        c = conn.cursor()
-        
         try:
-            c.execute('''INSERT INTO artist_venues (artist_id, venue, last_played)
-                        VALUES (?, ?, ?)''', (artist_id, venue, datetime.now()))
-            conn.commit()
+            self.conn.execute('''INSERT INTO artist_venues (artist_id, venue, last_played)
+                                 VALUES (?, ?, ?)
+                                 ON CONFLICT(artist_id, venue) DO UPDATE SET
+                                     last_played = excluded.last_played''', (artist_id, venue, datetime.now()))
         except Exception as e:
             print(f"Database error: {str(e)}")
-            conn.rollback()
-        finally:
-            conn.close()
\ No newline at end of file
+
+    def update_venues_bulk(self, artist_ids: List[int], venue: str):
+        """Record a venue play for many artists in a single transaction"""
+        now = datetime.now()
+        try:
+            with self.conn:
+                self.conn.execute('BEGIN')
+                self.conn.executemany('''INSERT INTO artist_venues (artist_id, venue, last_played)
+                                         VALUES (?, ?, ?)
+                                         ON CONFLICT(artist_id, venue) DO UPDATE SET
+                                             last_played = excluded.last_played''',
+                                      [(artist_id, venue, now) for artist_id in artist_ids])
+        except Exception as e:
+            print(f"Database error: {str(e)}")
\ No newline at end of file
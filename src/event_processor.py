@@ -1,116 +1,252 @@
-import pandas as pd
-import aiohttp
 from bs4 import BeautifulSoup
 from datetime import datetime
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
+from dateutil import parser as date_parser
 import asyncio
-import re
+import xlsxwriter
+from artist_manager import ArtistManager
+from scrapers.session import fetch, close_session
+from scrapers.tribe_events import (
+    ROW_STRAINER, SEL_DATETIME, SEL_DESCRIPTION, SEL_ROW, SEL_TICKET_LINK, SEL_TITLE,
+    SEL_TITLE_LINK, clean_text, fetch_tribe_events, strip_html
+)
+from scrapers.workers import run_in_process
+
+# Genre keywords, in priority order
+GENRES = {
+    'rock': ['rock', 'alternative', 'punk', 'metal'],
+    'country': ['country', 'bluegrass', 'americana'],
+    'jazz': ['jazz', 'blues', 'soul'],
+    'pop': ['pop', 'indie', 'electronic'],
+    'hip hop': ['hip hop', 'rap', 'r&b']
+}
+
+# Flattened (keyword, genre) pairs, still in priority order
+_GENRE_KEYWORDS = [(keyword, genre.title()) for genre, keywords in GENRES.items() for keyword in keywords]
+
+# Excel column headers and the event fields written under them
+_EXPORT_COLUMNS = [
+    ('Venue', 'venue'),
+    ('Band Name', 'band_name'),
+    ('Date & Time', 'date_time'),
+    ('Genre', 'genre'),
+    ('Ticket Status', 'ticket_status'),
+    ('Ticket Link', 'ticket_link')
+]
+
+# Date formats seen in Tribe calendar data, tried in order before dateutil
+_DATE_FORMATS = [
+    '%Y-%m-%d %H:%M:%S',    # REST feed start_date
+    '%B %d @ %I:%M %p',     # list view, e.g. "October 18 @ 9:00 pm"
+    '%B %d @ %I %p'         # list view on the hour, e.g. "October 18 @ 9 pm"
+]
+
+
+def _parse_dt(text: str, now: datetime) -> Optional[datetime]:
+    """Parse a calendar date string, returning None if it can't be parsed"""
+    # Drop the end of a range such as "October 18 @ 9:00 pm - 11:00 pm"
+    text = text.split(' - ')[0].strip()
+    for date_format in _DATE_FORMATS:
+        try:
+            parsed = datetime.strptime(text, date_format)
+        except ValueError:
+            continue
+        if '%Y' in date_format:
+            return parsed
+        # The list view omits the year; it only shows upcoming events, so a
+        # date well before now (when the page was read) belongs to next year
+        parsed = parsed.replace(year=now.year)
+        if (now - parsed).days > 30:
+            parsed = parsed.replace(year=now.year + 1)
+        return parsed
+    try:
+        return date_parser.parse(text.replace('@', ' '))
+    except (ValueError, OverflowError):
+        return None
+
+
+def _iso_date(text: str, now: datetime) -> str:
+    """ISO 8601 form of a calendar date string, or '' if it can't be parsed"""
+    parsed = _parse_dt(text, now)
+    return parsed.isoformat() if parsed else ''
+
+
+def _extract_genre(text: str) -> str:
+    """Extract genre from text using common genre keywords"""
+    text = text.lower()
+    for keyword, genre in _GENRE_KEYWORDS:
+        if keyword in text:
+            return genre
+    return 'Various/Unknown'
+
+
+def _get_ticket_info(event_elem, ticket_link, base_url: str) -> Dict[str, str]:
+    """Determine ticket status and get link if available"""
+    text = event_elem.text.lower()
+    
+    if 'free' in text:
+        return {'status': 'Free', 'link': ''}
+    elif ticket_link:
+        return {'status': 'Tickets Required', 'link': ticket_link['href']}
+    else:
+        return {'status': 'Contact Venue', 'link': base_url}
+
+
+def _parse_page(html: str, base_url: str) -> List[Dict[str, Any]]:
+    """Build event data from the HTML calendar list view"""
+    events = []
+    # One reference time for the whole page, so every row infers years alike
+    now = datetime.now()
+    soup = BeautifulSoup(html, 'lxml', parse_only=ROW_STRAINER)
+    
+    event_elements = SEL_ROW.select(soup)
+    
+    for event in event_elements:
+        try:
+            # Basic event info
+            title_elem = SEL_TITLE.select_one(event)
+            date_elem = SEL_DATETIME.select_one(event)
+            desc_elem = SEL_DESCRIPTION.select_one(event)
+            ticket_link = SEL_TICKET_LINK.select_one(event)
+            
+            # Get the full event details URL
+            event_url = SEL_TITLE_LINK.select_one(event)
+            
+            # Extract genre from description or title
+            genre = _extract_genre(desc_elem.text if desc_elem else title_elem.text)
+            
+            # Determine if event is free or needs tickets
+            ticket_info = _get_ticket_info(event, ticket_link, base_url)
+            
+            # Keep the display date, plus an ISO form for sorting
+            date_text = clean_text(date_elem.text) if date_elem else 'TBA'
+            
+            event_data = {
+                'venue': "Doc's Tavern",
+                'band_name': clean_text(title_elem.text) if title_elem else 'TBA',
+                'date_time': date_text,
+                'date_time_iso': _iso_date(date_text, now),
+                'genre': genre,
+                'ticket_status': ticket_info['status'],
+                'ticket_link': ticket_info['link']
+            }
+            
+            events.append(event_data)
+            
+        except Exception as e:
+            print(f"Error parsing event: {str(e)}")
+            continue
+    
+    return events
+
 
 class DocsTavernEventProcessor:
     def __init__(self):
         self.base_url = 'https://docstavernsc.com/calendar/'
+        self.api_url = 'https://docstavernsc.com/wp-json/tribe/events/v1/events'
         self.headers = {
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
         }
 
     async def scrape_events(self) -> List[Dict[str, Any]]:
         events = []
-        async with aiohttp.ClientSession() as session:
+        try:
+            # The Tribe REST feed has every field we need; scrape HTML only if it's unavailable
+            feed_events = await fetch_tribe_events(self.api_url, headers=self.headers)
+            if feed_events is not None:
+                return self.parse_feed_events(feed_events)
+            
+            response = await fetch(self.base_url, headers=self.headers)
+            html = await response.text()
+            events = await run_in_process(_parse_page, html, self.base_url)
+            
+        except Exception as e:
+            print(f"Error accessing Doc's Tavern calendar: {str(e)}")
+            
+        return events
+    
+    def parse_feed_events(self, feed_events: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Build event data from Tribe REST feed events"""
+        events = []
+        now = datetime.now()
+        for event in feed_events:
             try:
-                async with session.get(self.base_url, headers=self.headers) as response:
-                    html = await response.text()
-                    soup = BeautifulSoup(html, 'html.parser')
-                    
-                    event_elements = soup.select('.tribe-events-calendar-list__event-row')
-                    
-                    for event in event_elements:
-                        try:
-                            # Basic event info
-                            title_elem = event.select_one('.tribe-events-calendar-list__event-title')
-                            date_elem = event.select_one('.tribe-events-calendar-list__event-datetime')
-                            desc_elem = event.select_one('.tribe-events-calendar-list__event-description')
-                            ticket_link = event.select_one('a[href*="ticket"]')
-                            
-                            # Get the full event details URL
-                            event_url = event.select_one('.tribe-events-calendar-list__event-title-link')
-                            
-                            # Extract genre from description or title
-                            genre = self.extract_genre(desc_elem.text if desc_elem else title_elem.text)
-                            
-                            # Determine if event is free or needs tickets
-                            ticket_info = self.get_ticket_info(event, ticket_link)
-                            
-                            event_data = {
-                                'venue': "Doc's Tavern",
-                                'band_name': self.clean_text(title_elem.text) if title_elem else 'TBA',
-                                'date_time': self.clean_text(date_elem.text) if date_elem else 'TBA',
-                                'genre': genre,
-                                'ticket_status': ticket_info['status'],
-                                'ticket_link': ticket_info['link']
-                            }
-                            
-                            events.append(event_data)
-                            
-                        except Exception as e:
-                            print(f"Error parsing event: {str(e)}")
-                            continue
-                            
-            except Exception as e:
-                print(f"Error accessing Doc's Tavern calendar: {str(e)}")
+                title = strip_html(event.get('title'))
+                description = strip_html(event.get('description'))
+                
+                # Extract genre from description or title
+                genre = self.extract_genre(description or title)
+                
+                # Determine if event is free or needs tickets
+                text = ' '.join([title, description, strip_html(event.get('cost'))])
+                ticket_info = self.get_feed_ticket_info(event, text)
+                
+                event_data = {
+                    'venue': "Doc's Tavern",
+                    'band_name': title or 'TBA',
+                    'date_time': event.get('start_date') or 'TBA',
+                    'date_time_iso': _iso_date(event.get('start_date') or '', now),
+                    'genre': genre,
+                    'ticket_status': ticket_info['status'],
+                    'ticket_link': ticket_info['link']
+                }
                 
+                events.append(event_data)
+                
+            except Exception as e:
+                print(f"Error parsing event: {str(e)}")
+                continue
+        
         return events
     
     def extract_genre(self, text: str) -> str:
         """Extract genre from text using common genre keywords"""
-        genres = {
-            'rock': ['rock', 'alternative', 'punk', 'metal'],
-            'country': ['country', 'bluegrass', 'americana'],
-            'jazz': ['jazz', 'blues', 'soul'],
-            'pop': ['pop', 'indie', 'electronic'],
-            'hip hop': ['hip hop', 'rap', 'r&b']
-        }
-        
-        text = text.lower()
-        for genre, keywords in genres.items():
-            if any(keyword in text for keyword in keywords):
-                return genre.title()
-        return 'Various/Unknown'
+        return _extract_genre(text)
     
-    def get_ticket_info(self, event_elem, ticket_link) -> Dict[str, str]:
-        """Determine ticket status and get link if available"""
-        text = event_elem.text.lower()
-        
-        if 'free' in text:
+    def get_feed_ticket_info(self, event: Dict[str, Any], text: str) -> Dict[str, str]:
+        """Determine ticket status and link for a Tribe REST feed event from its plain text"""
+        if 'free' in text.lower():
             return {'status': 'Free', 'link': ''}
-        elif ticket_link:
-            return {'status': 'Tickets Required', 'link': ticket_link['href']}
+        elif event.get('website'):
+            return {'status': 'Tickets Required', 'link': event['website']}
         else:
-            return {'status': 'Contact Venue', 'link': self.base_url}
-    
-    def clean_text(self, text: str) -> str:
-        """Clean and standardize text"""
-        return ' '.join(text.split()).strip()
+            return {'status': 'Contact Venue', 'link': event.get('url') or self.base_url}
     
     def export_to_excel(self, events: List[Dict[str, Any]], filename: str = 'live_music_events.xlsx'):
         """Export events to Excel spreadsheet"""
-        df = pd.DataFrame(events)
-        df = df[['venue', 'band_name', 'date_time', 'genre', 'ticket_status', 'ticket_link']]
-        df.columns = ['Venue', 'Band Name', 'Date & Time', 'Genre', 'Ticket Status', 'Ticket Link']
+        # Sort by date (ISO strings sort chronologically), with undated events last
+        events = sorted(events, key=lambda event: (not event.get('date_time_iso'), event.get('date_time_iso', '')))
         
-        # Sort by date
-        df['Date & Time'] = pd.to_datetime(df['Date & Time'], format='mixed')
-        df = df.sort_values('Date & Time')
+        # Rows are written in order, so the workbook can stream them to disk
+        workbook = xlsxwriter.Workbook(filename, {'constant_memory': True})
+        worksheet = workbook.add_worksheet()
+        worksheet.write_row(0, 0, [header for header, _ in _EXPORT_COLUMNS])
         
-        # Format date for display
-        df['Date & Time'] = df['Date & Time'].dt.strftime('%Y-%m-%d %I:%M %p')
+        for row, event in enumerate(events, start=1):
+            values = [event[field] for _, field in _EXPORT_COLUMNS]
+            # Format date for display
+            if event.get('date_time_iso'):
+                values[2] = datetime.fromisoformat(event['date_time_iso']).strftime('%Y-%m-%d %I:%M %p')
+            worksheet.write_row(row, 0, values)
         
-        df.to_excel(filename, index=False)
+        workbook.close()
         print(f"Events exported to {filename}")
 
 async def main():
     processor = DocsTavernEventProcessor()
-    events = await processor.scrape_events()
-    processor.export_to_excel(events)
+    try:
+        events = await processor.scrape_events()
+        processor.export_to_excel(events)
+        
+        # Record every scraped band in one batch rather than per event. This is
+        # best-effort: a database problem shouldn't fail the scrape.
+        try:
+            band_names = [event['band_name'] for event in events if event['band_name'] != 'TBA']
+            await ArtistManager().process_artists(band_names, venue="Doc's Tavern")
+        except Exception as e:
+            print(f"Error recording artists: {str(e)}")
+    finally:
+        await close_session()
 
 if __name__ == "__main__":
     asyncio.run(main())
\ No newline at end of file
@@ -1,10 +1,91 @@
-import aiohttp
-from bs4 import BeautifulSoup
+import asyncio
+from bs4 import BeautifulSoup, SoupStrainer
 from datetime import datetime
 from typing import List, Dict, Any
 from .base_scraper import BaseScraper
-import json
-import re
+from .session import fetch
+from .tribe_events import (
+    ROW_STRAINER, SEL_DATETIME, SEL_DESCRIPTION, SEL_PRICE, SEL_ROW, SEL_TITLE,
+    SEL_TITLE_LINK, clean_text, fetch_tribe_events, strip_html
+)
+from .workers import run_in_process
+import diskcache
+import orjson
+import time
+
+_LD_JSON_STRAINER = SoupStrainer('script', type='application/ld+json')
+
+# Event details persist across runs; entries older than EVENT_DETAILS_TTL are
+# revalidated with a conditional GET, and dropped entirely after a week
+_cache = diskcache.Cache('.scrape_cache')
+EVENT_DETAILS_TTL = 6 * 3600
+EVENT_DETAILS_EXPIRE = 7 * 24 * 3600
+
+
+def _parse_page(html: str, venue_name: str, base_url: str) -> List[Dict[str, Any]]:
+    """Build event data from the HTML calendar list view"""
+    events = []
+    soup = BeautifulSoup(html, 'lxml', parse_only=ROW_STRAINER)
+    
+    # Find all event entries - they typically use tribe-events-calendar classes
+    event_elements = SEL_ROW.select(soup)
+    
+    for event_element in event_elements:
+        try:
+            # Extract event details
+            title_elem = SEL_TITLE.select_one(event_element)
+            date_elem = SEL_DATETIME.select_one(event_element)
+            desc_elem = SEL_DESCRIPTION.select_one(event_element)
+            link_elem = SEL_TITLE_LINK.select_one(event_element)
+            
+            if not title_elem or not date_elem:
+                continue
+
+            event_data = {
+                'venue': venue_name,
+                'title': clean_text(title_elem.text),
+                'date': clean_text(date_elem.text),
+                'url': link_elem['href'] if link_elem else base_url,
+                'description': clean_text(desc_elem.text) if desc_elem else '',
+            }
+
+            # Some events might have additional details like price
+            price_elem = SEL_PRICE.select_one(event_element)
+            if price_elem:
+                event_data['price'] = clean_text(price_elem.text)
+            else:
+                event_data['price'] = 'Contact venue for price'
+
+            events.append(event_data)
+            
+        except Exception as e:
+            print(f"Error parsing event: {str(e)}")
+            continue
+
+    return events
+
+
+def _parse_event_details(html: str) -> Dict[str, Any]:
+    """Parse event details from the structured data on an event page"""
+    soup = BeautifulSoup(html, 'lxml', parse_only=_LD_JSON_STRAINER)
+    
+    details = {}
+    
+    # Look for structured data
+    script_tag = soup.find('script', {'type': 'application/ld+json'})
+    if script_tag:
+        try:
+            # orjson only accepts exact str/bytes, not bs4's str subclasses
+            json_data = orjson.loads(script_tag.string.encode())
+            if isinstance(json_data, dict):
+                details['start_date'] = json_data.get('startDate')
+                details['end_date'] = json_data.get('endDate')
+                details['price'] = json_data.get('price')
+        except:
+            pass
+    
+    return details
+
 
 class DocsTavernScraper(BaseScraper):
     def __init__(self):
@@ -12,6 +93,7 @@ class DocsTavernScraper(BaseScraper):
             venue_name="Doc's Tavern",
             base_url='https://docstavernsc.com/calendar/'
         )
+        self.api_url = 'https://docstavernsc.com/wp-json/tribe/events/v1/events'
 
     def parse_event_time(self, time_str: str) -> str:
         """Parse event time from various formats"""
@@ -23,76 +105,97 @@ class DocsTavernScraper(BaseScraper):
     async def scrape_events(self) -> List[Dict[str, Any]]:
         events = []
         
-        async with aiohttp.ClientSession() as session:
+        try:
+            # Prefer the Tribe REST feed; scrape the calendar HTML only if it's unavailable
+            feed_events = await fetch_tribe_events(self.api_url, headers=self.headers)
+            if feed_events is not None:
+                return self.parse_feed_events(feed_events)
+
+            # Fetch the main calendar page
+            response = await fetch(self.base_url, headers=self.headers)
+            if response.status != 200:
+                print(f"Error fetching Doc's Tavern calendar: {response.status}")
+                return events
+
+            html = await response.text()
+            events = await run_in_process(_parse_page, html, self.venue_name, self.base_url)
+
+        except Exception as e:
+            print(f"Error scraping Doc's Tavern: {str(e)}")
+            
+        return events
+
+    def parse_feed_events(self, feed_events: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Build event data from Tribe REST feed events"""
+        events = []
+        
+        for event in feed_events:
             try:
-                # Fetch the main calendar page
-                async with session.get(self.base_url, headers=self.headers) as response:
-                    if response.status != 200:
-                        print(f"Error fetching Doc's Tavern calendar: {response.status}")
-                        return events
-
-                    html = await response.text()
-                    soup = BeautifulSoup(html, 'html.parser')
-                    
-                    # Find all event entries - they typically use tribe-events-calendar classes
-                    event_elements = soup.select('.tribe-events-calendar-list__event-row')
-                    
-                    for event_element in event_elements:
-                        try:
-                            # Extract event details
-                            title_elem = event_element.select_one('.tribe-events-calendar-list__event-title')
-                            date_elem = event_element.select_one('.tribe-events-calendar-list__event-datetime')
-                            desc_elem = event_element.select_one('.tribe-events-calendar-list__event-description')
-                            link_elem = event_element.select_one('.tribe-events-calendar-list__event-title-link')
-                            
-                            if not title_elem or not date_elem:
-                                continue
-
-                            event_data = {
-                                'venue': self.venue_name,
-                                'title': self.clean_text(title_elem.text),
-                                'date': self.clean_text(date_elem.text),
-                                'url': link_elem['href'] if link_elem else self.base_url,
-                                'description': self.clean_text(desc_elem.text) if desc_elem else '',
-                            }
-
-                            # Some events might have additional details like price
-                            price_elem = event_element.select_one('.tribe-events-c-small-cta__price')
-                            if price_elem:
-                                event_data['price'] = self.clean_text(price_elem.text)
-                            else:
-                                event_data['price'] = 'Contact venue for price'
-
-                            events.append(event_data)
-                            
-                        except Exception as e:
-                            print(f"Error parsing event: {str(e)}")
-                            continue
+                title = strip_html(event.get('title'))
+                if not title or not event.get('start_date'):
+                    continue
 
-            except Exception as e:
-                print(f"Error scraping Doc's Tavern: {str(e)}")
+                events.append({
+                    'venue': self.venue_name,
+                    'title': title,
+                    'date': event['start_date'],
+                    'url': event.get('url') or self.base_url,
+                    'description': strip_html(event.get('description')),
+                    'price': strip_html(event.get('cost')) or 'Contact venue for price',
+                })
                 
+            except Exception as e:
+                print(f"Error parsing event: {str(e)}")
+                continue
+        
         return events
 
     async def get_event_details(self, event_url: str) -> Dict[str, Any]:
         """Get additional details from event page"""
-        async with aiohttp.ClientSession() as session:
-            async with session.get(event_url, headers=self.headers) as response:
-                html = await response.text()
-                soup = BeautifulSoup(html, 'html.parser')
-                
-                details = {}
-                
-                # Look for structured data
-                script_tag = soup.find('script', {'type': 'application/ld+json'})
-                if script_tag:
-                    try:
-                        json_data = json.loads(script_tag.string)
-                        if isinstance(json_data, dict):
-                            details['start_date'] = json_data.get('startDate')
-                            details['end_date'] = json_data.get('endDate')
-                            details['price'] = json_data.get('price')
-                    except:
-                        pass
-                
-                return details
+        entry = _cache.get(event_url)
+        if entry and time.time() - entry['fetched_at'] < EVENT_DETAILS_TTL:
+            return entry['details']
+
+        # Revalidate stale entries so an unchanged page costs a 304
+        headers = dict(self.headers)
+        if entry and entry['etag']:
+            headers['If-None-Match'] = entry['etag']
+        if entry and entry['last_modified']:
+            headers['If-Modified-Since'] = entry['last_modified']
+
+        # A stale entry is still better than nothing if the refresh fails
+        try:
+            response = await fetch(event_url, headers=headers)
+        except Exception:
+            if entry:
+                return entry['details']
+            raise
+        if entry and response.status == 304:
+            details = entry['details']
+        elif response.status == 200:
+            details = await run_in_process(_parse_event_details, await response.text())
+        else:
+            return entry['details'] if entry else {}
+
+        _cache.set(event_url, {
+            'details': details,
+            'etag': response.headers.get('ETag') or (entry and entry['etag']),
+            'last_modified': response.headers.get('Last-Modified') or (entry and entry['last_modified']),
+            'fetched_at': time.time()
+        }, expire=EVENT_DETAILS_EXPIRE)
+        return details
+
+    async def get_events_details(self, event_urls: List[str]) -> List[Dict[str, Any]]:
+        """Get additional details for several event pages concurrently"""
+        results = await asyncio.gather(
+            *(self.get_event_details(url) for url in event_urls),
+            return_exceptions=True
+        )
+        
+        details = []
+        for url, result in zip(event_urls, results):
+            if isinstance(result, Exception):
+                print(f"Error fetching event details for {url}: {str(result)}")
+                result = {}
+            details.append(result)
+        return details
\ No newline at end of file
@@ -0,0 +1,111 @@
+import aiohttp
+import asyncio
+import functools
+import random
+from typing import Dict, Optional
+from urllib.parse import urlsplit
+
+DEFAULT_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
+}
+
+# Responses worth retrying: rate limited or a transient server error
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+# Longest Retry-After we'll honour, in seconds, so one header can't stall a scrape
+MAX_RETRY_AFTER = 30
+
+# Shared across scrapers so connections (and TLS handshakes) are reused
+_SESSION: Optional[aiohttp.ClientSession] = None
+
+
+class RateLimiter:
+    """Spaces out requests so at most max_rate start per time_period"""
+
+    def __init__(self, max_rate: float = 8, time_period: float = 1.0):
+        self.interval = time_period / max_rate
+        self._next_slot = 0.0
+
+    async def wait(self):
+        """Wait for the next free request slot"""
+        now = asyncio.get_running_loop().time()
+        slot = max(now, self._next_slot)
+        self._next_slot = slot + self.interval
+        if slot > now:
+            await asyncio.sleep(slot - now)
+
+
+_LIMITERS: Dict[str, RateLimiter] = {}
+
+
+def _get_limiter(url: str) -> RateLimiter:
+    """Get the rate limiter for a URL's host"""
+    host = urlsplit(url).netloc
+    if host not in _LIMITERS:
+        _LIMITERS[host] = RateLimiter()
+    return _LIMITERS[host]
+
+
+def _retry_after(response: aiohttp.ClientResponse) -> Optional[float]:
+    """Read a numeric Retry-After header, if the server sent one"""
+    try:
+        return float(response.headers.get('Retry-After', ''))
+    except ValueError:
+        return None
+
+
+def retry_with_backoff(tries: int = 5, base: float = 0.5):
+    """Retry a request coroutine on client errors and retryable statuses,
+    with exponential backoff plus jitter between attempts"""
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            for attempt in range(tries):
+                delay = base * 2 ** attempt + random.uniform(0, base)
+                try:
+                    response = await func(*args, **kwargs)
+                except (aiohttp.ClientError, asyncio.TimeoutError):
+                    if attempt == tries - 1:
+                        raise
+                else:
+                    if response.status not in RETRY_STATUSES or attempt == tries - 1:
+                        return response
+                    retry_after = _retry_after(response)
+                    if retry_after is not None:
+                        delay = min(retry_after, MAX_RETRY_AFTER)
+                await asyncio.sleep(delay)
+        return wrapper
+    return decorator
+
+
+async def get_session() -> aiohttp.ClientSession:
+    """Get the shared HTTP session, creating it on first use"""
+    global _SESSION
+    if _SESSION is None or _SESSION.closed:
+        _SESSION = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit_per_host=16, ttl_dns_cache=300, keepalive_timeout=60),
+            headers=DEFAULT_HEADERS
+        )
+    return _SESSION
+
+
+async def close_session():
+    """Close the shared HTTP session"""
+    global _SESSION
+    if _SESSION is not None:
+        await _SESSION.close()
+        _SESSION = None
+
+
+@retry_with_backoff(tries=5, base=0.5)
+async def fetch(url: str, **kwargs) -> aiohttp.ClientResponse:
+    """GET a URL on the shared session, rate limited per host.
+
+    The body is read before returning, so the connection goes straight back
+    to the pool and the response can still be used with text()/json().
+    """
+    session = await get_session()
+    await _get_limiter(url).wait()
+    async with session.get(url, **kwargs) as response:
+        await response.read()
+    return response
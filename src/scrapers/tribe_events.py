@@ -0,0 +1,84 @@
+import aiohttp
+import asyncio
+import html
+import orjson
+import re
+import soupsieve
+from bs4 import SoupStrainer
+from datetime import date
+from typing import Any, Dict, List, Optional
+from .session import fetch
+
+_TAG_RE = re.compile(r'<[^>]+>')
+_WS_RE = re.compile(r'\s+')
+
+# Selectors for the Tribe Events calendar list view, compiled once
+SEL_ROW = soupsieve.compile('.tribe-events-calendar-list__event-row')
+SEL_TITLE = soupsieve.compile('.tribe-events-calendar-list__event-title')
+SEL_DATETIME = soupsieve.compile('.tribe-events-calendar-list__event-datetime')
+SEL_DESCRIPTION = soupsieve.compile('.tribe-events-calendar-list__event-description')
+SEL_TITLE_LINK = soupsieve.compile('.tribe-events-calendar-list__event-title-link')
+SEL_TICKET_LINK = soupsieve.compile('a[href*="ticket"]')
+SEL_PRICE = soupsieve.compile('.tribe-events-c-small-cta__price')
+
+
+def has_class(class_name: str):
+    """Strainer predicate matching one class of a (possibly multi-class) element"""
+    return lambda value: bool(value) and class_name in (value.split() if isinstance(value, str) else value)
+
+
+# Only event rows are built into the tree; the rest of the page is skipped
+ROW_STRAINER = SoupStrainer(class_=has_class('tribe-events-calendar-list__event-row'))
+
+
+def clean_text(text: str) -> str:
+    """Clean and standardize text"""
+    return _WS_RE.sub(' ', text).strip()
+
+
+def strip_html(text: Optional[str]) -> str:
+    """Strip tags and entities from an HTML fragment and collapse whitespace"""
+    if not text:
+        return ''
+    return clean_text(html.unescape(_TAG_RE.sub(' ', text)))
+
+
+async def fetch_tribe_events(api_url: str, headers: Optional[Dict[str, str]] = None,
+                             per_page: int = 50) -> Optional[List[Dict[str, Any]]]:
+    """Fetch upcoming events from a Tribe Events REST endpoint, following pagination.
+
+    Returns None if the endpoint isn't available (e.g. the REST API is
+    disabled and it 404s) so callers can fall back to scraping HTML. If a
+    later page fails, the events fetched so far are returned.
+    """
+    events = []
+    url = api_url
+    params = {'per_page': per_page, 'start_date': date.today().isoformat()}
+    
+    while url:
+        try:
+            response = await fetch(url, params=params, headers=headers)
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            if not events:
+                return None
+            print(f"Error fetching Tribe events page {url}: {str(e)}")
+            break
+        
+        if response.status != 200:
+            if not events:
+                return None
+            print(f"Error fetching Tribe events page {url}: {response.status}")
+            break
+        
+        try:
+            data = orjson.loads(await response.text())
+        except ValueError:
+            return None if not events else events
+        
+        events.extend(data.get('events', []))
+        
+        # next_rest_url already carries the query string
+        url = data.get('next_rest_url')
+        params = None
+    
+    return events
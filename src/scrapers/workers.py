@@ -0,0 +1,33 @@
+import asyncio
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Optional
+
+# Shared pool for CPU-bound page parsing, so it runs off the event loop and
+# across cores; created on first use
+_PROCESS_POOL: Optional[ProcessPoolExecutor] = None
+
+# A venue scrape parses a handful of pages, so a few workers are plenty
+PROCESS_POOL_WORKERS = min(4, os.cpu_count() or 1)
+
+
+def _get_process_pool() -> ProcessPoolExecutor:
+    """Get the shared process pool, creating it on first use"""
+    global _PROCESS_POOL
+    if _PROCESS_POOL is None:
+        # forkserver rather than fork: workers start on demand instead of all at
+        # once, and aren't forked from a parent already running aiohttp's threads
+        _PROCESS_POOL = ProcessPoolExecutor(max_workers=PROCESS_POOL_WORKERS,
+                                            mp_context=multiprocessing.get_context('forkserver'))
+    return _PROCESS_POOL
+
+
+async def run_in_process(func: Callable[..., Any], *args) -> Any:
+    """Run CPU-bound parsing in the shared process pool, off the event loop.
+
+    func is pickled by reference, so it must be a module-level function, and
+    args should be plain values: a bound method would pickle its whole instance.
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_get_process_pool(), func, *args)